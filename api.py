@@ -1,23 +1,84 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, status
+from fastapi import Body, FastAPI, HTTPException, Request, UploadFile, File, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field, validator
-from typing import Optional, List
-from datetime import datetime
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, StringConstraints
+from typing import Annotated, Dict, Optional, List
+from datetime import datetime, timezone
 import uvicorn
+import charset_normalizer
+import codecs
+import json
 import logging
 import os
 from contextlib import asynccontextmanager
+from functools import partial
 
-from pricelens_pipeline import run_pricelens_pipeline
+from anyio import to_thread
+from openai import NotFoundError
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from slowapi.util import get_remote_address
+
+from pricelens_pipeline import (
+    build_pricelens_crew,
+    close_http_clients,
+    get_pricelens_batch_results,
+    get_pricelens_llm,
+    run_pricelens_pipeline,
+    stream_pricelens_pipeline,
+    submit_pricelens_batch,
+)
 
 # Configure logging
+# Production should run at LOG_LEVEL=WARNING; log calls use %-style arguments
+# so suppressed records are never formatted. Aliases such as WARN resolve to
+# the canonical name, which is also the form uvicorn's log_level accepts.
+LOG_LEVEL = logging.getLevelName(logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper()))
+if LOG_LEVEL not in ("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"):
+    raise ValueError(
+        f"Invalid LOG_LEVEL {os.getenv('LOG_LEVEL')!r}. Use one of: CRITICAL, ERROR, WARNING, INFO, DEBUG"
+    )
 logging.basicConfig(
-    level=logging.INFO,
+    level=LOG_LEVEL,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+# Transcript size cap, enforced before any LLM work is started
+MAX_TRANSCRIPT_CHARS = int(os.getenv("MAX_TRANSCRIPT_CHARS", "100000"))
+
+# Maximum number of transcripts accepted by /analyze-batch
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "100"))
+
+# Upload limits for /analyze-file
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(2 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+ALLOWED_UPLOAD_EXTENSIONS = frozenset({".txt", ".md"})
+
+# Worst-case request body sizes, checked against Content-Length before the body
+# is read. In JSON an astral character escaped as a \uXXXX surrogate pair takes
+# 12 bytes; leave room for the other fields (or the multipart boundary and part
+# headers of an upload, which Starlette would otherwise spool to disk in full).
+MAX_ANALYSIS_BODY_BYTES = MAX_TRANSCRIPT_CHARS * 12 + 4096
+TRANSCRIPT_TOO_LARGE = f"Transcript too large. Maximum length is {MAX_TRANSCRIPT_CHARS} characters"
+MAX_BODY_BYTES = {
+    "/analyze": (MAX_ANALYSIS_BODY_BYTES, TRANSCRIPT_TOO_LARGE),
+    "/analyze-stream": (MAX_ANALYSIS_BODY_BYTES, TRANSCRIPT_TOO_LARGE),
+    "/analyze-batch": (MAX_ANALYSIS_BODY_BYTES * MAX_BATCH_SIZE, TRANSCRIPT_TOO_LARGE),
+    "/analyze-file": (
+        MAX_UPLOAD_BYTES + 16 * 1024,
+        f"File too large. Maximum size is {MAX_UPLOAD_BYTES // 1024} KB"
+    ),
+}
+
+# Per-client rate limit for the analysis endpoints. The default in-memory
+# storage is per worker; point RATE_LIMIT_STORAGE_URI at Redis to share it.
+ANALYSIS_RATE_LIMIT = os.getenv("ANALYSIS_RATE_LIMIT", "10/minute")
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+)
+
 # Lifespan context manager for startup/shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -28,9 +89,18 @@ async def lifespan(app: FastAPI):
         logger.warning("⚠️  OPENAI_API_KEY not set. API will fail on analysis requests.")
     else:
         logger.info("✅ OpenAI API key configured")
+        # Build the shared LLM once per worker instead of on the first request
+        get_pricelens_llm()
+        # Build a throwaway crew so CrewAI's lazy imports happen before the first request
+        build_pricelens_crew()
+    # Each analysis holds a worker thread for the whole LLM round trip, so the
+    # thread limiter caps how many analyses can run concurrently per worker
+    thread_limit = int(os.getenv("PRICELENS_THREAD_LIMIT", "64"))
+    to_thread.current_default_thread_limiter().total_tokens = thread_limit
     yield
     # Shutdown
     logger.info("🛑 PriceLens API shutting down...")
+    await close_http_clients()
 
 app = FastAPI(
     title="PriceLens AI API",
@@ -38,6 +108,26 @@ app = FastAPI(
     version="2.0.0",
     lifespan=lifespan
 )
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+# Reject oversized bodies before they are read, parsed or validated. Registered
+# before CORSMiddleware so it runs inside it and its 413s carry CORS headers.
+@app.middleware("http")
+async def limit_analysis_body_size(request: Request, call_next):
+    content_length = request.headers.get("content-length")
+    max_body_bytes, detail = MAX_BODY_BYTES.get(request.url.path, (None, None))
+    if (
+        max_body_bytes is not None
+        and content_length
+        and content_length.isdigit()
+        and int(content_length) > max_body_bytes
+    ):
+        return JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={"detail": detail}
+        )
+    return await call_next(request)
 
 # Enable CORS for frontend development
 app.add_middleware(
@@ -50,19 +140,17 @@ app.add_middleware(
 
 # Request/Response Models
 class AnalysisRequest(BaseModel):
-    transcript: str = Field(..., min_length=10, description="Customer interview transcript text")
+    transcript: Annotated[
+        str,
+        StringConstraints(strip_whitespace=True, min_length=10, max_length=MAX_TRANSCRIPT_CHARS),
+        Field(description="Customer interview transcript text")
+    ]
     product_type: str = Field(default="SaaS", description="Type of product (SaaS, E-commerce, B2B, etc.)")
     stage: str = Field(default="Pre-revenue", description="Business stage (Pre-revenue, Early-stage, Growth, etc.)")
-    
-    @validator('transcript')
-    def validate_transcript(cls, v):
-        if len(v.strip()) < 10:
-            raise ValueError('Transcript must be at least 10 characters long')
-        return v.strip()
 
 class AnalysisResponse(BaseModel):
     result: str = Field(..., description="Markdown-formatted analysis report")
-    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     product_type: str
     stage: str
     transcript_length: int
@@ -70,13 +158,30 @@ class AnalysisResponse(BaseModel):
 class HealthResponse(BaseModel):
     status: str
     version: str
-    timestamp: str
+    timestamp: datetime
     openai_configured: bool
 
+class BatchSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    request_count: int
+
+class BatchItemResult(BaseModel):
+    index: int = Field(..., description="Position of the transcript in the submitted batch")
+    result: Optional[str] = Field(default=None, description="Markdown-formatted analysis report")
+    error: Optional[str] = None
+
+class BatchStatusResponse(BaseModel):
+    job_id: str
+    status: str = Field(..., description="OpenAI batch status (validating, in_progress, completed, failed, ...)")
+    request_counts: Dict[str, int] = Field(..., description="OpenAI request counts, including one guidance request per distinct product type and stage")
+    results: Optional[List[BatchItemResult]] = Field(default=None, description="Present once the batch has finished")
+
 class ErrorResponse(BaseModel):
     error: str
     detail: Optional[str] = None
-    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 # Health Check Endpoint
 @app.get("/health", response_model=HealthResponse)
@@ -86,7 +191,7 @@ async def health_check():
     return HealthResponse(
         status="healthy",
         version="2.0.0",
-        timestamp=datetime.now().isoformat(),
+        timestamp=datetime.now(timezone.utc),
         openai_configured=bool(api_key and api_key != "your_openai_api_key_here")
     )
 
@@ -101,14 +206,17 @@ async def root():
         "endpoints": {
             "health": "/health",
             "analyze": "/analyze",
+            "analyze_stream": "/analyze-stream",
             "analyze_file": "/analyze-file",
+            "analyze_batch": "/analyze-batch",
             "docs": "/docs"
         }
     }
 
 # Main Analysis Endpoint
 @app.post("/analyze", response_model=AnalysisResponse, status_code=status.HTTP_200_OK)
-async def analyze_transcript(request: AnalysisRequest):
+@limiter.limit(ANALYSIS_RATE_LIMIT)
+async def analyze_transcript(request: Request, analysis_request: AnalysisRequest):
     """
     Analyze a customer interview transcript and generate pricing strategy insights.
     
@@ -119,40 +227,152 @@ async def analyze_transcript(request: AnalysisRequest):
     - Validation experiments
     """
     try:
-        logger.info(f"📊 Starting analysis for {request.product_type} product at {request.stage} stage")
-        logger.info(f"📝 Transcript length: {len(request.transcript)} characters")
-        
-        # Run the AI pipeline
-        output = run_pricelens_pipeline(
-            transcript_text=request.transcript,
-            product_type=request.product_type,
-            stage=request.stage
+        logger.info(
+            "📊 Starting analysis for %s product at %s stage",
+            analysis_request.product_type, analysis_request.stage
         )
+        logger.info("📝 Transcript length: %d characters", len(analysis_request.transcript))
+        
+        # Run the AI pipeline off the event loop
+        output = await to_thread.run_sync(partial(
+            run_pricelens_pipeline,
+            transcript_text=analysis_request.transcript,
+            product_type=analysis_request.product_type,
+            stage=analysis_request.stage
+        ))
         
         logger.info("✅ Analysis completed successfully")
         
         return AnalysisResponse(
             result=str(output),
-            product_type=request.product_type,
-            stage=request.stage,
-            transcript_length=len(request.transcript)
+            product_type=analysis_request.product_type,
+            stage=analysis_request.stage,
+            transcript_length=len(analysis_request.transcript)
         )
     except ValueError as e:
-        logger.error(f"❌ Validation error: {str(e)}")
+        logger.warning("❌ Validation error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except Exception as e:
-        logger.error(f"❌ Analysis error: {str(e)}", exc_info=True)
+        logger.error("❌ Analysis error: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Analysis failed: {str(e)}"
         )
 
+# Streaming Analysis Endpoint
+@app.post("/analyze-stream")
+@limiter.limit(ANALYSIS_RATE_LIMIT)
+async def analyze_transcript_stream(request: Request, analysis_request: AnalysisRequest):
+    """
+    Analyze a customer interview transcript and stream the report as it is generated.
+    
+    Returns a `text/event-stream` response:
+    - `data:` events carry JSON-encoded markdown fragments, in order
+    - a final `done` event marks completion
+    - an `error` event carries `{error, detail}` if the analysis fails mid-stream
+    """
+    logger.info(
+        "📡 Starting streamed analysis for %s product at %s stage",
+        analysis_request.product_type, analysis_request.stage
+    )
+    
+    async def event_stream():
+        try:
+            async for fragment in stream_pricelens_pipeline(
+                transcript_text=analysis_request.transcript,
+                product_type=analysis_request.product_type,
+                stage=analysis_request.stage
+            ):
+                yield f"data: {json.dumps(fragment)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logger.error("❌ Streamed analysis error: %s", e, exc_info=True)
+            payload = {"error": "Analysis failed", "detail": str(e)}
+            yield f"event: error\ndata: {json.dumps(payload)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Byte-order marks and the codecs that strip them; UTF-32 LE must be checked
+# before UTF-16 LE, whose BOM is a prefix of it
+UNICODE_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+def decode_transcript(content: bytearray) -> str:
+    """
+    Decode uploaded transcript bytes with a single decode on the happy path.
+    
+    The first bytes are probed for a BOM to pick UTF-8/16/32; without one the
+    content is decoded as UTF-8, then as Windows-1252 (the usual encoding of
+    legacy Windows exports, which charset detection tends to mistake for other
+    single-byte code pages on short English texts).
+    
+    Raises:
+        UnicodeDecodeError: If the content is valid in neither encoding
+    """
+    encoding = next(
+        (codec for bom, codec in UNICODE_BOMS if content.startswith(bom)),
+        "utf-8"
+    )
+    try:
+        return content.decode(encoding)
+    except UnicodeDecodeError:
+        if encoding != "utf-8":
+            raise
+    text = content.decode("cp1252")
+    logger.warning("⚠️  Upload is not valid UTF-8; decoded as cp1252")
+    return text
+
+def detect_transcript_text(content: bytearray) -> Optional[str]:
+    """Decode bytes with charset detection, or return None if no encoding fits."""
+    best = charset_normalizer.from_bytes(content).best()
+    if best is None:
+        return None
+    logger.warning("⚠️  Upload encoding detected as %s", best.encoding)
+    return str(best)
+
+async def read_upload_text(file: UploadFile) -> str:
+    """
+    Read an uploaded file in bounded chunks and decode it.
+    
+    Raises:
+        HTTPException: 413 if the file exceeds MAX_UPLOAD_BYTES
+        UnicodeDecodeError: If the file's encoding could not be determined
+    """
+    content = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        content += chunk
+        if len(content) > MAX_UPLOAD_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File too large. Maximum size is {MAX_UPLOAD_BYTES // 1024} KB"
+            )
+    try:
+        return decode_transcript(content)
+    except UnicodeDecodeError:
+        # Charset detection is CPU-bound (~0.1s for a full-size upload);
+        # keep it off the event loop
+        text = await to_thread.run_sync(detect_transcript_text, content)
+        if text is None:
+            raise
+        return text
+
 # File Upload Analysis Endpoint
 @app.post("/analyze-file", response_model=AnalysisResponse, status_code=status.HTTP_200_OK)
+@limiter.limit(ANALYSIS_RATE_LIMIT)
 async def analyze_uploaded_file(
+    request: Request,
     file: UploadFile = File(...),
     product_type: str = "SaaS",
     stage: str = "Pre-revenue"
@@ -161,10 +381,10 @@ async def analyze_uploaded_file(
     Analyze a customer interview transcript from an uploaded file.
     
     Currently supports:
-    - .txt files (UTF-8 encoded)
+    - .txt and .md files (UTF-8 preferred; UTF-16/32 with a BOM and legacy encodings are detected)
     
     Future support planned for:
-    - .docx, .pdf, .md files
+    - .docx, .pdf files
     """
     try:
         # Validate file extension
@@ -174,24 +394,22 @@ async def analyze_uploaded_file(
                 detail="No filename provided"
             )
         
-        allowed_extensions = ['.txt', '.md']
-        file_ext = os.path.splitext(file.filename)[1].lower()
+        _, dot, ext = file.filename.rpartition(".")
+        file_ext = f".{ext.lower()}" if dot else ""
         
-        if file_ext not in allowed_extensions:
+        if file_ext not in ALLOWED_UPLOAD_EXTENSIONS:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File type '{file_ext}' not supported. Allowed: {', '.join(allowed_extensions)}"
+                detail=f"File type '{file_ext}' not supported. Allowed: {', '.join(sorted(ALLOWED_UPLOAD_EXTENSIONS))}"
             )
         
         # Read and decode file content
-        content = await file.read()
-        
         try:
-            transcript_text = content.decode("utf-8")
+            transcript_text = await read_upload_text(file)
         except UnicodeDecodeError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File must be UTF-8 encoded"
+                detail="Could not determine the file's text encoding. Please upload a UTF-8 text file."
             )
         
         if len(transcript_text.strip()) < 10:
@@ -200,16 +418,23 @@ async def analyze_uploaded_file(
                 detail="File content is too short. Please provide a transcript with at least 10 characters."
             )
         
-        logger.info(f"📄 Processing file: {file.filename} ({len(transcript_text)} characters)")
+        if len(transcript_text) > MAX_TRANSCRIPT_CHARS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Transcript too large. Maximum length is {MAX_TRANSCRIPT_CHARS} characters"
+            )
         
-        # Run the AI pipeline
-        output = run_pricelens_pipeline(
+        logger.info("📄 Processing file: %s (%d characters)", file.filename, len(transcript_text))
+        
+        # Run the AI pipeline off the event loop
+        output = await to_thread.run_sync(partial(
+            run_pricelens_pipeline,
             transcript_text=transcript_text,
             product_type=product_type,
             stage=stage
-        )
+        ))
         
-        logger.info(f"✅ File analysis completed for {file.filename}")
+        logger.info("✅ File analysis completed for %s", file.filename)
         
         return AnalysisResponse(
             result=str(output),
@@ -220,33 +445,106 @@ async def analyze_uploaded_file(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ File analysis error: {str(e)}", exc_info=True)
+        logger.error("❌ File analysis error: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"File analysis failed: {str(e)}"
         )
 
+# Batch Analysis Endpoints
+@app.post("/analyze-batch", response_model=BatchSubmitResponse, status_code=status.HTTP_202_ACCEPTED)
+@limiter.limit(ANALYSIS_RATE_LIMIT)
+async def submit_analysis_batch(
+    request: Request,
+    analysis_requests: Annotated[List[AnalysisRequest], Body(min_length=1, max_length=MAX_BATCH_SIZE)]
+):
+    """
+    Submit several transcripts for non-urgent analysis via the OpenAI Batch API.
+    
+    Batch jobs cost half as much as real-time analyses and complete within 24 hours.
+    Poll the returned `status_url` for progress and results.
+    """
+    try:
+        logger.info("📦 Submitting batch of %d transcripts", len(analysis_requests))
+        batch = await submit_pricelens_batch([
+            (item.transcript, item.product_type, item.stage) for item in analysis_requests
+        ])
+        return BatchSubmitResponse(
+            job_id=batch.id,
+            status=batch.status,
+            status_url=str(request.url_for("get_analysis_batch", job_id=batch.id)),
+            request_count=len(analysis_requests)
+        )
+    except ValueError as e:
+        logger.warning("❌ Validation error: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error("❌ Batch submission error: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch submission failed: {str(e)}"
+        )
+
+@app.get("/analyze-batch/{job_id}", response_model=BatchStatusResponse)
+async def get_analysis_batch(job_id: str):
+    """
+    Get the status of a batch analysis job, with its reports once it has finished.
+    
+    Results are listed in submission order; failed analyses carry an `error` instead of a `result`.
+    """
+    try:
+        batch, results = await get_pricelens_batch_results(job_id)
+    except (NotFoundError, LookupError):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Batch job '{job_id}' not found"
+        )
+    except Exception as e:
+        logger.error("❌ Batch status error: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch status lookup failed: {str(e)}"
+        )
+    
+    counts = batch.request_counts
+    return BatchStatusResponse(
+        job_id=batch.id,
+        status=batch.status,
+        request_counts={
+            "total": counts.total if counts else 0,
+            "completed": counts.completed if counts else 0,
+            "failed": counts.failed if counts else 0
+        },
+        results=results
+    )
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
-    logger.error(f"❌ Unhandled exception: {str(exc)}", exc_info=True)
+    logger.error("❌ Unhandled exception: %s", exc, exc_info=True)
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "error": "Internal server error",
             "detail": "An unexpected error occurred. Please try again later.",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now(timezone.utc).isoformat()
         }
     )
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     host = os.getenv("HOST", "0.0.0.0")
-    logger.info(f"🌐 Starting server on {host}:{port}")
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    logger.info("🌐 Starting server on %s:%d with %d worker(s)", host, port, workers)
+    # uvloop/httptools are picked automatically when installed (uvicorn[standard])
     uvicorn.run(
-        app,
+        "api:app",
         host=host,
         port=port,
+        workers=workers,
         timeout_keep_alive=300,
-        log_level="info"
+        log_level=LOG_LEVEL.lower()
     )
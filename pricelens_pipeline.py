@@ -1,31 +1,285 @@
 import os
+import asyncio
+import hashlib
+import json
 import logging
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from textwrap import dedent
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any, List, Optional, Set, Tuple
 
 from dotenv import load_dotenv
-from crewai import Agent, Task, Crew, Process
+
+# Load .env first so values set there override the telemetry defaults below
+load_dotenv()
+
+# Opt out of CrewAI/OpenTelemetry and Chroma telemetry before crewai is
+# imported, so the first kickoff doesn't spend time setting up exporters
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+import httpx
+from cachetools import TTLCache
+from crewai import Agent, Task, Crew, LLM, Process
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
+from openai import AsyncOpenAI
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# CrewAI's verbose mode prints rich-formatted logs on every LLM turn; keep it
+# off in production and opt in with CREW_VERBOSE=1 when debugging prompts.
+CREW_VERBOSE = os.getenv("CREW_VERBOSE") == "1"
 
-def build_pricelens_crew():
+# Exact-match cache of finished reports, so repeated submissions of the same
+# transcript (retries, double-submits, demos) skip the LLM calls entirely.
+_RESULT_CACHE = TTLCache(
+    maxsize=int(os.getenv("PRICELENS_CACHE_SIZE", "256")),
+    ttl=int(os.getenv("PRICELENS_CACHE_TTL", "86400")),
+)
+_RESULT_CACHE_LOCK = threading.Lock()
+
+# Runs currently executing, by cache key. Concurrent identical requests wait on
+# the first run's Future instead of each paying for their own LLM calls.
+_IN_FLIGHT: Dict[str, Future] = {}
+
+# Runs the guidance call next to the (blocking) crew kickoff
+_GUIDANCE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="pricelens-guidance")
+
+# Async guidance calls, detached from the request that started them so a client
+# disconnect can't cancel a result other requests are waiting on. asyncio only
+# keeps weak references to tasks, so hold them here until they finish.
+_GUIDANCE_TASKS: Set[asyncio.Task] = set()
+
+# Connection pool settings for the shared OpenAI HTTP clients
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+_HTTP_TIMEOUT = httpx.Timeout(300.0, connect=10.0)
+
+# Prompt templates, dedented once at import rather than on every crew build
+_STRATEGIST_ROLE = "Chief Pricing Strategist"
+
+_STRATEGIST_GOAL = (
+    "Extract all pricing signals, willingness-to-pay indicators, and market "
+    "dynamics from customer interviews, and transform them into an actionable "
+    "pricing strategy with clear recommendations, risk assessment, and "
+    "validation roadmap."
+)
+
+_STRATEGIST_BACKSTORY = dedent(
     """
-    Construct the enhanced PriceLens AI crew with specialized agents.
+    You are a Chief Pricing Officer with 20+ years of experience analyzing 
+    customer behavior and building pricing strategies for companies ranging 
+    from pre-revenue startups to billion-dollar enterprises. You have an 
+    exceptional ability to read between the lines in customer interviews, 
+    identifying subtle signals that others miss, and you're known for balancing 
+    ambition with pragmatism to maximize revenue while minimizing risk.
     
-    Architecture:
-    - Market Analyst: Extracts signals and analyzes willingness-to-pay
-    - Pricing Strategist: Develops strategy, assesses risks, plans validation
+    Your expertise includes:
+    - Behavioral economics and price psychology
+    - Customer segmentation and persona development
+    - Competitive and value-based pricing
+    - B2B and B2C pricing strategies
+    - Launching pricing for 50+ SaaS products
+    
+    You understand that pricing is both art and science, and you excel at 
+    translating customer insights into winning pricing strategies.
+    """
+).strip()
+
+_PRICING_TASK_PROMPT = dedent(
+    """
+    Analyze the customer interview transcript below and produce a Pricing 
+    Strategy Report in two parts.
+    
+    Consider the product type: {product_type}
+    Consider the business stage: {stage}
+    
+    # PART 1 — MARKET ANALYSIS (working notes)
+    
+    Start your response with your market analysis as a single compact JSON 
+    object wrapped in <analysis> and </analysis> tags. Part 1 is not shown to the 
+    reader, so use no prose or markdown and keep it under 400 words. Use these keys:
+    
+    - "signals": alternatives used, prices paid (exact amounts), satisfaction and 
+      switching costs, pain points with intensity (1-10), value drivers, 
+      time/money cost of the problem, direct price mentions, budget, 
+      decision-making authority, urgency
+    - "wtp": primary range (low-high), secondary range if any, confidence (0-100), 
+      factors raising and lowering confidence, one-line rationale per range
+    - "segments": list of segments with WTP and characteristics
+    - "classification": "Painkiller" or "Vitamin", with a one-line justification
+    - "market_dynamics": positioning opportunities, competitive advantages, 
+      likely pricing objections, upsell/cross-sell opportunities
+    
+    Quote short transcript evidence where it supports a value.
+    
+    # PART 2 — PRICING STRATEGY
+    
+    After the closing </analysis> tag, write the report for the reader, building 
+    on your Part 1 analysis:
+    
+    ## 1. PRICING RECOMMENDATION
+    
+    **Launch Price:**
+    - Specific recommended price (or narrow range if uncertainty exists)
+    - Pricing model recommendation (subscription, one-time, usage-based, etc.)
+    - Pricing tier structure (if applicable)
+    - Rationale connecting price to WTP analysis and market signals
+    
+    **Target Segment:**
+    - Primary target customer segment
+    - Secondary segments (if applicable)
+    - Segment prioritization rationale
+    
+    **Pricing Strategy:**
+    - Penetration vs. skimming strategy recommendation
+    - Discount strategy (if applicable)
+    - Freemium vs. paid-only recommendation
+    - Justification based on stage and market conditions
+    
+    ## 2. RISK ASSESSMENT
+    
+    **Confidence Score:**
+    - Overall confidence in pricing recommendation (0-100%)
+    - Breakdown by component (WTP confidence, market data quality, etc.)
+    
+    **Key Risks:**
+    - Overpricing risks (what could go wrong if too high)
+    - Underpricing risks (what could go wrong if too low)
+    - Market risks (competitive response, market changes)
+    - Execution risks (ability to communicate value, sales process)
+    
+    **Risk Mitigation:**
+    - Strategies to reduce each identified risk
+    - Early warning indicators to monitor
+    
+    ## 3. VALIDATION ROADMAP
+    
+    **Immediate Next Steps (Week 1-2):**
+    - Specific, actionable validation experiments
+    - Success metrics and thresholds
+    - Resource requirements
+    
+    **Short-term Tests (Month 1-3):**
+    - Pricing page A/B tests
+    - Pre-order campaigns
+    - Landing page price tests
+    - Customer interview follow-ups
+    
+    **Long-term Validation (Quarter 1-2):**
+    - Market testing approaches
+    - Iteration strategy
+    - Key metrics to track
+    
+    Do not write an implementation guidance section (go-to-market, KPIs); it is 
+    generated separately and appended after your report.
+    
+    ## OUTPUT FORMAT
+    
+    Part 2 must be a polished, executive-ready markdown report that:
+    - Starts with an executive summary
+    - Summarizes the key market signals and WTP findings it relies on
+    - Uses bullet points, specific quotes from the transcript (in italics) 
+      and highlighted data points (prices, percentages, etc.)
+    - Includes specific numbers, recommendations and confidence indicators
+    - Provides actionable next steps
+    - Is suitable for sharing with founders, investors, or pricing teams
+    
+    Be thorough, specific, and evidence-based. Every claim should be backed by 
+    something from the transcript.
+    
+    TRANSCRIPT:
+    {transcript}
+    """
+).strip()
+
+_PRICING_EXPECTED_OUTPUT = (
+    "A compact JSON market analysis (signals, WTP, segments, classification, "
+    "market dynamics) wrapped in <analysis></analysis> tags, followed by a "
+    "comprehensive, executive-ready markdown report with specific pricing "
+    "recommendations, risk assessment and validation roadmap. The report "
+    "should be actionable and evidence-based."
+)
+
+# Implementation guidance depends only on product type and stage, so it is
+# generated concurrently with the transcript analysis and cached separately
+_GUIDANCE_PROMPT = dedent(
+    """
+    Write the implementation guidance section of a pricing strategy report for a 
+    {product_type} product at the {stage} stage.
+    
+    ## 4. IMPLEMENTATION GUIDANCE
+    
+    **Go-to-Market Considerations:**
+    - Messaging recommendations for price communication
+    - Sales enablement needs
+    - Customer education requirements
+    
+    **Success Metrics:**
+    - KPIs to track (conversion rate, ARPU, churn, etc.)
+    - Target benchmarks typical for this product type and stage
+    - Review cadence
+    
+    Start your response with the heading "## 4. IMPLEMENTATION GUIDANCE" and keep 
+    it concise, specific and scannable markdown. Output only this section.
+    """
+).strip()
+
+# custom_id of a report line in a PriceLens batch job
+_BATCH_REPORT_ID = re.compile(r"^report-(\d+)-guidance-(\d+)$")
+
+# Closes the Part 1 working notes; everything after it is the user-facing report
+_ANALYSIS_END_TAG = "</analysis>"
+
+
+@lru_cache(maxsize=1)
+def get_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """
+    Return the process-wide HTTP/2 clients for the direct OpenAI calls.
+    
+    The sync client serves the implementation guidance call and the async
+    client the streaming and batch paths; sharing them keeps connections alive
+    across requests so only the first call per worker pays the TLS handshake.
+    Crew runs go through CrewAI's own client instead (see get_crew_llm).
     
     Returns:
-        Crew: Configured CrewAI crew instance
+        Tuple[httpx.Client, httpx.AsyncClient]: Sync and async clients
     """
-    # Load environment variables
-    load_dotenv()
+    return (
+        httpx.Client(http2=True, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT),
+        httpx.AsyncClient(http2=True, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT),
+    )
+
+
+async def close_http_clients() -> None:
+    """Close the shared HTTP clients (and the LLM bound to them), if created."""
+    if get_http_clients.cache_info().currsize:
+        sync_client, async_client = get_http_clients()
+        sync_client.close()
+        await async_client.aclose()
+        get_pricelens_llm.cache_clear()
+        get_crew_llm.cache_clear()
+        get_openai_client.cache_clear()
+        get_http_clients.cache_clear()
+
 
+@lru_cache(maxsize=1)
+def get_pricelens_llm() -> ChatOpenAI:
+    """
+    Return the process-wide LLM shared by every PriceLens crew.
+    
+    The configuration is immutable for the lifetime of the process, so the
+    environment is read and the client constructed only once per worker.
+    
+    Returns:
+        ChatOpenAI: Configured LLM instance
+    
+    Raises:
+        ValueError: If OPENAI_API_KEY is not configured
+    """
     # Ensure API Key is available
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key or api_key == "your_openai_api_key_here":
@@ -36,266 +290,110 @@ def build_pricelens_crew():
     # Configure LLM with optimized settings
     model_name = os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini")
     temperature = float(os.getenv("OPENAI_TEMPERATURE", "0.2"))
+    http_client, http_async_client = get_http_clients()
     
     llm = ChatOpenAI(
         model=model_name,
         temperature=temperature,
         max_tokens=4000,
+        http_client=http_client,
+        http_async_client=http_async_client,
     )
     
-    logger.info(f"🤖 Using model: {model_name} (temperature: {temperature})")
-
-    # 🧠 AGENT 1 — MARKET ANALYST (Signal Extraction + WTP Analysis)
-    market_analyst = Agent(
-        role="Senior Market & Pricing Analyst",
-        goal=(
-            "Extract all pricing signals, willingness-to-pay indicators, and market "
-            "dynamics from customer interviews with precision and depth."
-        ),
-        backstory=dedent(
-            """
-            You are a world-class pricing analyst with 15+ years of experience analyzing 
-            customer behavior and market dynamics. You've worked with Fortune 500 companies 
-            and startups alike, helping them understand their pricing power. You have an 
-            exceptional ability to read between the lines in customer interviews, identifying 
-            subtle signals that others miss. You combine quantitative analysis with qualitative 
-            insights to build a complete picture of customer willingness-to-pay.
-            
-            Your expertise includes:
-            - Behavioral economics and price psychology
-            - Customer segmentation and persona development
-            - Competitive pricing analysis
-            - Value-based pricing methodologies
-            - B2B and B2C pricing strategies
-            """
-        ).strip(),
-        verbose=True,
-        llm=llm,
-        allow_delegation=False,
-        max_iter=3,
-        max_execution_time=300,
-    )
+    logger.info("🤖 Using model: %s (temperature: %s)", model_name, temperature)
+    return llm
 
-    analysis_task = Task(
-        description=dedent(
-            """
-            Conduct a comprehensive analysis of the customer interview transcript provided.
-            
-            Your analysis must include:
-            
-            ## 1. SIGNAL EXTRACTION
-            
-            Extract and categorize all pricing-related signals:
-            
-            **Competitive Intelligence:**
-            - Current alternatives/solutions the customer uses
-            - Prices paid for alternatives (exact amounts if mentioned)
-            - Satisfaction level with current solutions
-            - Switching costs and barriers mentioned
-            
-            **Value Indicators:**
-            - Pain points and their intensity (rate 1-10)
-            - Value drivers and desired outcomes
-            - Time/money costs of current problems
-            - ROI expectations or mentions
-            
-            **Price Sensitivity Signals:**
-            - Direct price mentions ("expensive", "affordable", "worth it", etc.)
-            - Budget constraints or mentions
-            - Decision-making authority indicators
-            - Urgency indicators
-            
-            ## 2. WILLINGNESS-TO-PAY (WTP) ANALYSIS
-            
-            Based on the signals extracted, provide:
-            
-            **WTP Estimation:**
-            - Primary WTP range (low-high) with confidence level
-            - Secondary WTP range if multiple segments identified
-            - Rationale for each range based on specific transcript evidence
-            
-            **Customer Segmentation:**
-            - Identify distinct customer segments (if applicable)
-            - WTP by segment
-            - Segment characteristics and size indicators
-            
-            **Product Classification:**
-            - Classify as "Painkiller" (mission-critical) or "Vitamin" (nice-to-have)
-            - Justify classification with evidence
-            - Impact on pricing power
-            
-            **Confidence Assessment:**
-            - Rate confidence in WTP estimate (0-100%)
-            - List factors increasing confidence
-            - List factors decreasing confidence or creating uncertainty
-            
-            ## 3. MARKET DYNAMICS
-            
-            Identify:
-            - Market positioning opportunities
-            - Competitive advantages mentioned
-            - Potential pricing objections
-            - Upsell/cross-sell opportunities
-            
-            ## OUTPUT FORMAT
-            
-            Structure your analysis as clear, well-organized markdown with:
-            - Headers and subheaders
-            - Bullet points for key findings
-            - Specific quotes from transcript (in italics)
-            - Data points highlighted (prices, percentages, etc.)
-            - Clear confidence indicators
-            
-            Be thorough, specific, and evidence-based. Every claim should be backed by 
-            something from the transcript.
-            """
-        ).strip(),
-        expected_output=(
-            "A comprehensive markdown report with signal extraction, WTP analysis, "
-            "customer segmentation, and market dynamics. The report should be detailed, "
-            "evidence-based, and actionable."
-        ),
-        agent=market_analyst,
-        context_variables=["transcript"],
+
+@lru_cache(maxsize=1)
+def get_crew_llm() -> LLM:
+    """
+    Return the process-wide CrewAI LLM used by every crew run.
+    
+    CrewAI converts any non-CrewAI LLM handed to an Agent into a fresh
+    crewai.LLM (dropping its HTTP clients), and the agent is rebuilt on every
+    run. Passing one shared crewai.LLM instead keeps the same SDK client, and
+    so its open connections, across runs. It mirrors get_pricelens_llm's
+    settings so both paths produce the same report.
+    
+    Returns:
+        LLM: Configured CrewAI LLM instance
+    
+    Raises:
+        ValueError: If OPENAI_API_KEY is not configured
+    """
+    chat_llm = get_pricelens_llm()
+    return LLM(
+        model=chat_llm.model_name,
+        temperature=chat_llm.temperature,
+        max_tokens=chat_llm.max_tokens,
+        timeout=_HTTP_TIMEOUT.read,
+        api_key=os.getenv("OPENAI_API_KEY"),
     )
 
-    # 🧠 AGENT 2 — LEAD STRATEGIST (Strategy + Risk + Validation)
+
+@lru_cache(maxsize=1)
+def get_openai_client() -> AsyncOpenAI:
+    """
+    Return the process-wide raw OpenAI client, for APIs LangChain doesn't wrap.
+    
+    Returns:
+        AsyncOpenAI: Client sharing the pooled async HTTP client
+    
+    Raises:
+        ValueError: If OPENAI_API_KEY is not configured
+    """
+    # Validates the configuration, same as every LLM call
+    get_pricelens_llm()
+    return AsyncOpenAI(http_client=get_http_clients()[1])
+
+
+def build_pricelens_crew():
+    """
+    Construct the enhanced PriceLens AI crew.
+    
+    Architecture:
+    - Pricing Strategist: A single agent that extracts market signals and
+      willingness-to-pay (Part 1), then turns them into a pricing strategy,
+      risk assessment and validation plan (Part 2) in one LLM call
+    
+    The LLM is shared across calls (see get_crew_llm); the agent, task and
+    crew are rebuilt each time because kickoff mutates them with per-run
+    state and they are not safe to share between concurrent requests.
+    
+    Returns:
+        Crew: Configured CrewAI crew instance
+    """
+    llm = get_crew_llm()
+
+    # 🧠 PRICING STRATEGIST (Signal Extraction + WTP + Strategy + Validation)
     strategist = Agent(
-        role="Chief Pricing Strategist",
-        goal=(
-            "Transform market analysis into actionable pricing strategy with clear "
-            "recommendations, risk assessment, and validation roadmap."
-        ),
-        backstory=dedent(
-            """
-            You are a Chief Pricing Officer with 20+ years of experience building pricing 
-            strategies for companies ranging from pre-revenue startups to billion-dollar 
-            enterprises. You've launched hundreds of products and pricing models, learning 
-            what works and what doesn't. You're known for your ability to balance ambition 
-            with pragmatism, creating pricing strategies that maximize revenue while 
-            minimizing risk.
-            
-            Your track record includes:
-            - Launching pricing for 50+ SaaS products
-            - Designing pricing models that increased ARR by 200%+
-            - Building pricing functions from scratch
-            - Training pricing teams at top tech companies
-            
-            You understand that pricing is both art and science, and you excel at 
-            translating customer insights into winning pricing strategies.
-            """
-        ).strip(),
-        verbose=True,
+        role=_STRATEGIST_ROLE,
+        goal=_STRATEGIST_GOAL,
+        backstory=_STRATEGIST_BACKSTORY,
+        verbose=CREW_VERBOSE,
         llm=llm,
         allow_delegation=False,
         max_iter=3,
         max_execution_time=300,
     )
 
-    strategy_task = Task(
-        description=dedent(
-            """
-            Using the Market Analysis provided, create a comprehensive Pricing Strategy Report.
-            
-            Consider the product type: {product_type}
-            Consider the business stage: {stage}
-            
-            Your report must include:
-            
-            ## 1. PRICING RECOMMENDATION
-            
-            **Launch Price:**
-            - Specific recommended price (or narrow range if uncertainty exists)
-            - Pricing model recommendation (subscription, one-time, usage-based, etc.)
-            - Pricing tier structure (if applicable)
-            - Rationale connecting price to WTP analysis and market signals
-            
-            **Target Segment:**
-            - Primary target customer segment
-            - Secondary segments (if applicable)
-            - Segment prioritization rationale
-            
-            **Pricing Strategy:**
-            - Penetration vs. skimming strategy recommendation
-            - Discount strategy (if applicable)
-            - Freemium vs. paid-only recommendation
-            - Justification based on stage and market conditions
-            
-            ## 2. RISK ASSESSMENT
-            
-            **Confidence Score:**
-            - Overall confidence in pricing recommendation (0-100%)
-            - Breakdown by component (WTP confidence, market data quality, etc.)
-            
-            **Key Risks:**
-            - Overpricing risks (what could go wrong if too high)
-            - Underpricing risks (what could go wrong if too low)
-            - Market risks (competitive response, market changes)
-            - Execution risks (ability to communicate value, sales process)
-            
-            **Risk Mitigation:**
-            - Strategies to reduce each identified risk
-            - Early warning indicators to monitor
-            
-            ## 3. VALIDATION ROADMAP
-            
-            **Immediate Next Steps (Week 1-2):**
-            - Specific, actionable validation experiments
-            - Success metrics and thresholds
-            - Resource requirements
-            
-            **Short-term Tests (Month 1-3):**
-            - Pricing page A/B tests
-            - Pre-order campaigns
-            - Landing page price tests
-            - Customer interview follow-ups
-            
-            **Long-term Validation (Quarter 1-2):**
-            - Market testing approaches
-            - Iteration strategy
-            - Key metrics to track
-            
-            ## 4. IMPLEMENTATION GUIDANCE
-            
-            **Go-to-Market Considerations:**
-            - Messaging recommendations for price communication
-            - Sales enablement needs
-            - Customer education requirements
-            
-            **Success Metrics:**
-            - KPIs to track (conversion rate, ARPU, churn, etc.)
-            - Target benchmarks
-            - Review cadence
-            
-            ## OUTPUT FORMAT
-            
-            Create a polished, executive-ready markdown report that:
-            - Starts with an executive summary
-            - Uses clear sections and formatting
-            - Includes specific numbers and recommendations
-            - Provides actionable next steps
-            - Is suitable for sharing with founders, investors, or pricing teams
-            
-            Make it comprehensive yet scannable. Use formatting (bold, italics, lists) 
-            to make key information stand out.
-            """
-        ).strip(),
-        expected_output=(
-            "A comprehensive, executive-ready pricing strategy report in markdown format "
-            "with specific recommendations, risk assessment, validation roadmap, and "
-            "implementation guidance. The report should be actionable and evidence-based."
-        ),
+    pricing_task = Task(
+        description=_PRICING_TASK_PROMPT,
+        expected_output=_PRICING_EXPECTED_OUTPUT,
         agent=strategist,
-        context_variables=["analysis_task_output", "product_type", "stage"],
+        context_variables=["transcript", "product_type", "stage"],
     )
 
     # Build the crew
     crew = Crew(
-        agents=[market_analyst, strategist],
-        tasks=[analysis_task, strategy_task],
+        agents=[strategist],
+        tasks=[pricing_task],
         process=Process.sequential,
-        verbose=True,
-        memory=True,  # Enable memory for better context retention
+        verbose=CREW_VERBOSE,
+        # Memory embeds every task output via the OpenAI embeddings API and
+        # writes it to a vector store on each kickoff. This crew is single-turn,
+        # so only re-enable it if agents become genuinely multi-turn.
+        memory=False,
         max_rpm=10,  # Rate limiting
     )
 
@@ -303,6 +401,192 @@ def build_pricelens_crew():
     return crew
 
 
+def build_pricelens_messages(
+    transcript_text: str,
+    product_type: str = "SaaS",
+    stage: str = "Pre-revenue"
+) -> List[BaseMessage]:
+    """
+    Render the crew's agent and task prompts as plain chat messages.
+    
+    Used by the streaming path, which talks to the LLM directly instead of
+    going through CrewAI, so both paths share the same prompt templates.
+    
+    Args:
+        transcript_text: Customer interview transcript to analyze
+        product_type: Type of product (SaaS, E-commerce, B2B, etc.)
+        stage: Business stage (Pre-revenue, Early-stage, Growth, etc.)
+    
+    Returns:
+        List[BaseMessage]: System and user messages for the LLM
+    """
+    system_prompt = (
+        f"You are {_STRATEGIST_ROLE}. {_STRATEGIST_BACKSTORY}\n"
+        f"Your personal goal is: {_STRATEGIST_GOAL}"
+    )
+    user_prompt = _PRICING_TASK_PROMPT.format(
+        transcript=transcript_text.strip(),
+        product_type=product_type,
+        stage=stage,
+    )
+    user_prompt += f"\n\nExpected output: {_PRICING_EXPECTED_OUTPUT}"
+    return [SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)]
+
+
+def build_guidance_messages(product_type: str, stage: str) -> List[BaseMessage]:
+    """
+    Render the implementation guidance prompt as plain chat messages.
+    
+    Args:
+        product_type: Type of product (SaaS, E-commerce, B2B, etc.)
+        stage: Business stage (Pre-revenue, Early-stage, Growth, etc.)
+    
+    Returns:
+        List[BaseMessage]: System and user messages for the LLM
+    """
+    system_prompt = f"You are {_STRATEGIST_ROLE}. {_STRATEGIST_BACKSTORY}"
+    user_prompt = _GUIDANCE_PROMPT.format(product_type=product_type, stage=stage)
+    return [SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)]
+
+
+def _guidance_cache_key(product_type: str, stage: str) -> str:
+    """Build the result cache key for an implementation guidance section."""
+    model_name = get_pricelens_llm().model_name
+    raw = f"guidance|{model_name}|{product_type}|{stage}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _claim_in_flight(cache_key: str) -> Tuple[Optional[str], Optional[Future], bool]:
+    """
+    Look up a cached result, or join or start the in-flight run for a key.
+    
+    Returns:
+        Tuple[Optional[str], Optional[Future], bool]: The cached value (if
+        any), the Future of the run producing it, and whether the caller
+        started that run and must settle it via _settle_in_flight
+    """
+    with _RESULT_CACHE_LOCK:
+        cached = _RESULT_CACHE.get(cache_key)
+        if cached is not None:
+            return cached, None, False
+        pending = _IN_FLIGHT.get(cache_key)
+        if pending is not None:
+            return None, pending, False
+        pending = _IN_FLIGHT[cache_key] = Future()
+        return None, pending, True
+
+
+def _settle_in_flight(
+    cache_key: str,
+    pending: Future,
+    result: Optional[str] = None,
+    error: Optional[BaseException] = None,
+    cache: bool = True
+) -> None:
+    """Cache a finished run's result (if any and cache is set) and release its waiters."""
+    with _RESULT_CACHE_LOCK:
+        if error is None and cache:
+            _RESULT_CACHE[cache_key] = result
+        _IN_FLIGHT.pop(cache_key, None)
+    if error is None:
+        pending.set_result(result)
+    else:
+        pending.set_exception(error)
+
+
+def get_implementation_guidance(product_type: str, stage: str) -> str:
+    """
+    Return the implementation guidance section for a product type and stage.
+    
+    Concurrent callers for the same product type and stage share one LLM call.
+    
+    Args:
+        product_type: Type of product (SaaS, E-commerce, B2B, etc.)
+        stage: Business stage (Pre-revenue, Early-stage, Growth, etc.)
+    
+    Returns:
+        str: Markdown guidance section, served from cache when available
+    """
+    cache_key = _guidance_cache_key(product_type, stage)
+    cached, pending, is_leader = _claim_in_flight(cache_key)
+    if cached is not None:
+        return cached
+    if not is_leader:
+        return pending.result()
+    
+    try:
+        response = get_pricelens_llm().invoke(build_guidance_messages(product_type, stage))
+    except Exception as e:
+        _settle_in_flight(cache_key, pending, error=e)
+        raise
+    guidance = response.content.strip()
+    _settle_in_flight(cache_key, pending, result=guidance)
+    return guidance
+
+
+async def _agenerate_guidance(
+    cache_key: str,
+    pending: Future,
+    product_type: str,
+    stage: str
+) -> None:
+    """Make the async guidance LLM call and settle its in-flight Future."""
+    try:
+        response = await get_pricelens_llm().ainvoke(build_guidance_messages(product_type, stage))
+    except asyncio.CancelledError:
+        # Only reached when the event loop shuts down; don't leave waiters hanging
+        _settle_in_flight(cache_key, pending, error=RuntimeError("Guidance generation was cancelled"))
+        raise
+    except Exception as e:
+        # Waiters get the error through the Future; the task itself ends cleanly
+        _settle_in_flight(cache_key, pending, error=e)
+        return
+    _settle_in_flight(cache_key, pending, result=response.content.strip())
+
+
+async def aget_implementation_guidance(product_type: str, stage: str) -> str:
+    """
+    Async variant of get_implementation_guidance, sharing its cache and in-flight runs.
+    
+    The LLM call runs in a detached task, and every caller (including the one
+    that started it) waits on the shared Future through asyncio.shield, so
+    cancelling one caller never cancels or fails the run for the others.
+    """
+    cache_key = _guidance_cache_key(product_type, stage)
+    cached, pending, is_leader = _claim_in_flight(cache_key)
+    if cached is not None:
+        return cached
+    if is_leader:
+        task = asyncio.ensure_future(_agenerate_guidance(cache_key, pending, product_type, stage))
+        _GUIDANCE_TASKS.add(task)
+        task.add_done_callback(_GUIDANCE_TASKS.discard)
+    return await asyncio.shield(asyncio.wrap_future(pending))
+
+
+def extract_report(raw_output: str) -> str:
+    """
+    Strip the Part 1 <analysis> working notes from a raw LLM response.
+    
+    Args:
+        raw_output: Full LLM response
+    
+    Returns:
+        str: The markdown report, or the raw response if no notes were found
+    """
+    notes, tag, report = raw_output.partition(_ANALYSIS_END_TAG)
+    if not tag:
+        logger.warning("⚠️  Response has no <analysis> block; returning it unmodified")
+        return raw_output
+    return report.strip()
+
+
+def _result_cache_key(transcript_text: str, product_type: str, stage: str) -> str:
+    """Build the result cache key for a pipeline run."""
+    model_name = get_pricelens_llm().model_name
+    raw = f"{model_name}|{product_type}|{stage}|{transcript_text.strip()}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
 def run_pricelens_pipeline(
     transcript_text: str,
     product_type: str = "SaaS",
@@ -316,6 +600,10 @@ def run_pricelens_pipeline(
         product_type: Type of product (SaaS, E-commerce, B2B, etc.)
         stage: Business stage (Pre-revenue, Early-stage, Growth, etc.)
     
+    Identical requests are served from an in-process cache for
+    PRICELENS_CACHE_TTL seconds (default: 24h), and identical requests that
+    arrive while a run is in progress share that run's result.
+    
     Returns:
         str: Markdown-formatted analysis report
     
@@ -327,12 +615,26 @@ def run_pricelens_pipeline(
     if not transcript_text or len(transcript_text.strip()) < 10:
         raise ValueError("Transcript must be at least 10 characters long")
     
-    logger.info(f"🚀 Starting PriceLens pipeline")
-    logger.info(f"   Product Type: {product_type}")
-    logger.info(f"   Stage: {stage}")
-    logger.info(f"   Transcript Length: {len(transcript_text)} characters")
+    cache_key = _result_cache_key(transcript_text, product_type, stage)
+    cached, pending, is_leader = _claim_in_flight(cache_key)
+    if cached is not None:
+        logger.info("⚡ Returning cached analysis")
+        return cached
+    if not is_leader:
+        logger.info("⏳ Joining in-flight analysis for identical transcript")
+        return pending.result()
+    
+    logger.info("🚀 Starting PriceLens pipeline")
+    logger.info("   Product Type: %s", product_type)
+    logger.info("   Stage: %s", stage)
+    logger.info("   Transcript Length: %d characters", len(transcript_text))
     
     try:
+        # Generate the transcript-independent guidance while the crew runs
+        guidance_future = _GUIDANCE_EXECUTOR.submit(
+            get_implementation_guidance, product_type, stage
+        )
+        
         # Build and run the crew
         crew = build_pricelens_crew()
         
@@ -352,16 +654,253 @@ def run_pricelens_pipeline(
             output = result.content
         else:
             output = str(result)
-        
-        logger.info("✅ Pipeline completed successfully")
-        return output
+        output = extract_report(output).rstrip()
         
     except Exception as e:
-        logger.error(f"❌ Pipeline error: {str(e)}", exc_info=True)
+        _settle_in_flight(cache_key, pending, error=e)
+        # The caller logs the traceback; don't record it twice
+        logger.error("❌ Pipeline error: %s", e)
         raise
+    
+    # A failed guidance call shouldn't discard the (already paid for) report;
+    # return it without section 4, but don't cache the incomplete result
+    try:
+        output += "\n\n" + guidance_future.result()
+        complete = True
+    except Exception as e:
+        logger.error("⚠️  Implementation guidance failed, returning report without it: %s", e)
+        complete = False
+    _settle_in_flight(cache_key, pending, result=output, cache=complete)
+    
+    logger.info("✅ Pipeline completed successfully")
+    return output
+
+
+async def stream_pricelens_pipeline(
+    transcript_text: str,
+    product_type: str = "SaaS",
+    stage: str = "Pre-revenue"
+) -> AsyncIterator[str]:
+    """
+    Stream the PriceLens report token by token as the LLM generates it.
+    
+    Shares the result cache with run_pricelens_pipeline: a cached report is
+    yielded in one piece, and a completed stream populates the cache.
+    
+    Args:
+        transcript_text: Customer interview transcript to analyze
+        product_type: Type of product (SaaS, E-commerce, B2B, etc.)
+        stage: Business stage (Pre-revenue, Early-stage, Growth, etc.)
+    
+    Yields:
+        str: Markdown fragments of the analysis report
+    
+    Raises:
+        ValueError: If transcript is too short or invalid
+        Exception: If the LLM call fails
+    """
+    # Validate input
+    if not transcript_text or len(transcript_text.strip()) < 10:
+        raise ValueError("Transcript must be at least 10 characters long")
+    
+    cache_key = _result_cache_key(transcript_text, product_type, stage)
+    with _RESULT_CACHE_LOCK:
+        cached = _RESULT_CACHE.get(cache_key)
+    if cached is not None:
+        logger.info("⚡ Returning cached analysis")
+        yield cached
+        return
+    
+    logger.info("🚀 Streaming PriceLens pipeline (%s, %s)", product_type, stage)
+    messages = build_pricelens_messages(transcript_text, product_type, stage)
+    
+    # Generate the transcript-independent guidance while the report streams
+    guidance_task = asyncio.ensure_future(aget_implementation_guidance(product_type, stage))
+    try:
+        # Hold back the Part 1 working notes; stream only the report after them,
+        # skipping whitespace until its first non-empty fragment
+        pending = ""
+        parts = []
+        async for chunk in get_pricelens_llm().astream(messages):
+            if not chunk.content:
+                continue
+            if pending is not None:
+                pending += chunk.content
+                notes, tag, report = pending.partition(_ANALYSIS_END_TAG)
+                if not tag:
+                    continue
+                pending = None
+                fragment = report
+            else:
+                fragment = chunk.content
+            if not parts:
+                fragment = fragment.lstrip()
+            if fragment:
+                parts.append(fragment)
+                yield fragment
+        if pending is not None:
+            # No notes block: fall back to the raw response, as extract_report does
+            fragment = extract_report(pending)
+            parts.append(fragment)
+            yield fragment
+        
+        try:
+            guidance = await guidance_task
+        except Exception as e:
+            # The report has already been streamed; end it without section 4
+            logger.error("⚠️  Implementation guidance failed, ending stream without it: %s", e)
+            return
+        yield "\n\n" + guidance
+    finally:
+        guidance_task.cancel()
+        # Mark a failed guidance call's exception as retrieved when the report
+        # stream itself errored first
+        guidance_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+    
+    # Cache the same normalized text run_pricelens_pipeline would return
+    report = "".join(parts).strip()
+    with _RESULT_CACHE_LOCK:
+        _RESULT_CACHE[cache_key] = report + "\n\n" + guidance
+    logger.info("✅ Streaming pipeline completed successfully")
+
+
+def _to_openai_messages(messages: List[BaseMessage]) -> List[Dict[str, str]]:
+    """Convert LangChain messages to OpenAI chat-completions message dicts."""
+    roles = {SystemMessage: "system", HumanMessage: "user"}
+    return [{"role": roles[type(m)], "content": m.content} for m in messages]
+
+
+async def submit_pricelens_batch(requests: List[Tuple[str, str, str]]) -> Any:
+    """
+    Submit several analyses as one OpenAI Batch API job.
+    
+    Batch jobs complete within 24h at half the price of real-time calls. The
+    job holds one report request per transcript plus one implementation
+    guidance request per distinct (product_type, stage); each report's
+    custom_id records which guidance request belongs to it.
+    
+    Args:
+        requests: (transcript_text, product_type, stage) tuples
+    
+    Returns:
+        Batch: The created OpenAI batch object
+    """
+    llm = get_pricelens_llm()
+    client = get_openai_client()
+    
+    def request_line(custom_id: str, messages: List[BaseMessage]) -> str:
+        return json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": llm.model_name,
+                "messages": _to_openai_messages(messages),
+                "temperature": llm.temperature,
+                "max_tokens": llm.max_tokens,
+            },
+        })
+    
+    lines = []
+    guidance_ids: Dict[Tuple[str, str], int] = {}
+    for index, (transcript_text, product_type, stage) in enumerate(requests):
+        if (product_type, stage) not in guidance_ids:
+            guidance_ids[(product_type, stage)] = len(guidance_ids)
+            lines.append(request_line(
+                f"guidance-{guidance_ids[(product_type, stage)]}",
+                build_guidance_messages(product_type, stage),
+            ))
+        guidance_id = guidance_ids[(product_type, stage)]
+        lines.append(request_line(
+            f"report-{index}-guidance-{guidance_id}",
+            build_pricelens_messages(transcript_text, product_type, stage),
+        ))
+    
+    batch_file = await client.files.create(
+        file=("pricelens-batch.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch",
+    )
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+        metadata={"source": "pricelens", "reports": str(len(requests))},
+    )
+    logger.info("📦 Submitted batch %s with %d analyses", batch.id, len(requests))
+    return batch
+
+
+async def get_pricelens_batch_results(batch_id: str) -> Tuple[Any, Optional[List[Dict[str, Any]]]]:
+    """
+    Fetch a batch job's status and, once finished, its assembled reports.
+    
+    Args:
+        batch_id: ID returned by submit_pricelens_batch
+    
+    Returns:
+        Tuple[Batch, Optional[List[Dict]]]: The batch object, and one
+        {index, result, error} dict per submitted analysis when the output
+        file is available (None while the job is still running)
+    
+    Raises:
+        LookupError: If the batch was not submitted by PriceLens
+    """
+    client = get_openai_client()
+    batch = await client.batches.retrieve(batch_id)
+    metadata = batch.metadata or {}
+    reports = metadata.get("reports", "")
+    if metadata.get("source") != "pricelens" or not reports.isdigit():
+        raise LookupError(f"Batch job '{batch_id}' not found")
+    if not batch.output_file_id and not batch.error_file_id:
+        return batch, None
+    
+    outputs: Dict[str, Dict[str, Any]] = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if file_id:
+            content = await client.files.content(file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    outputs[record["custom_id"]] = record
+    
+    def completion_text(record: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Optional[str]]:
+        if record is None:
+            return None, "No result returned for this request"
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            error = record.get("error") or response.get("body", {}).get("error") or {}
+            return None, error.get("message", "Request failed")
+        return response["body"]["choices"][0]["message"]["content"], None
+    
+    # Map submission index -> (report record, guidance id); skip foreign lines
+    report_records: Dict[int, Tuple[Dict[str, Any], str]] = {}
+    for custom_id, record in outputs.items():
+        match = _BATCH_REPORT_ID.match(custom_id)
+        if match:
+            report_records[int(match.group(1))] = (record, match.group(2))
+    
+    results = []
+    for index in range(int(reports)):
+        if index not in report_records:
+            report, error = completion_text(None)
+            results.append({"index": index, "result": report, "error": error})
+            continue
+        record, guidance_id = report_records[index]
+        report, error = completion_text(record)
+        guidance, guidance_error = completion_text(outputs.get(f"guidance-{guidance_id}"))
+        if report is not None:
+            report = extract_report(report)
+            if guidance is not None:
+                report = report.rstrip() + "\n\n" + guidance.strip()
+            else:
+                logger.warning("⚠️  Batch %s: guidance missing (%s)", batch_id, guidance_error)
+        results.append({"index": index, "result": report, "error": error})
+    return batch, results
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     sample_transcript = """
     Interviewer: How much do you pay for pricing tools?
     Founder: We pay $50/month but it is too cheap for what we get. 